@@ -10,54 +10,173 @@
 #     python datasetEnricher.py -i input.csv -o enriched.csv
 #
 # Optional:
-#     --cache ip_cache.json   # persist IP->TI responses to avoid re-querying
+#     --cache ip_cache.json   # persist IP->TI responses to avoid re-querying (new results are appended to ip_cache.jsonl)
 #     --rps 40                # requests per minute allowance for ip-api (<= 45 suggested)
 #     --batch 100             # up to 100 per ip-api batch
 #     --timeout 10            # HTTP timeout in seconds
+#     --workers 4             # processes for port/datetime/geo-lookup steps once IPs are cached
+#     --format parquet        # write Snappy-compressed Parquet instead of CSV (default: from -o suffix)
 #
 # Requirements:
 #     - pandas (pip install pandas)
 #     - requests (pip install requests)
+#     - aiohttp, aiolimiter (optional; pip install aiohttp aiolimiter) for concurrent ip-api batches
+#     - pyarrow (optional; pip install pyarrow) for the multithreaded CSV reader and Parquet output
+#     - filelock (optional; pip install filelock) to share one cache between parallel runs
 #
 # Notes:
 #     - ip-api.com free plan allows ~45 requests/min. We use batch POST with up to 100 IPs/request.
 #     - Only unique IPs are queried. Cached entries are reused.
+#     - Invalid and private/reserved IPv4 addresses are not sent; they get geo_status "fail" locally.
+#     - With aiohttp + aiolimiter installed, batches are sent concurrently, paced to one every 60/rpm seconds;
+#       otherwise they are sent one at a time with a fixed sleep between them.
 # 
 
 import argparse
+import asyncio
+import functools
 import json
+import multiprocessing as mp
+import os
 import socket
+from contextlib import nullcontext
+from datetime import datetime
 from pathlib import Path
 from time import sleep
-from typing import Dict, List
+from typing import Dict, List, Optional
 
+import numpy as np
 import pandas as pd
+from pandas.api.extensions import take
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import aiohttp
+    from aiolimiter import AsyncLimiter
+except ImportError:  # optional: fall back to the synchronous batch loop
+    aiohttp = None
+    AsyncLimiter = None
+
+try:
+    from filelock import FileLock
+except ImportError:  # optional: cache writes are then only safe for a single run at a time
+    FileLock = None
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:  # optional: fall back to pandas' C parser
+    pyarrow = None
 
 IP_API_URL = "http://ip-api.com/batch"  # up to 100 per request on free tier
 PORT_NAME_FALLBACK = "uncommon"
+_COL_SEPARATORS = str.maketrans(" -", "__")  # used by normalize_cols
+# Feodo timestamps: first_seen_utc carries a time, last_online is a bare date
+DATETIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d")
+# Parse-time dtypes keyed by normalized column name. dst_port is read as text so enrich_ports
+# can coerce bad values to NA instead of the parser failing on them; the timestamps are read as
+# text so pyarrow doesn't guess them and to_datetime can apply DATETIME_FORMATS.
+INPUT_DTYPES = {
+    "dst_ip": "string",
+    "dst_port": "string",
+    "first_seen_utc": "string",
+    "last_online": "string",
+}
+# IPv4 ranges ip-api can only answer "private/reserved range" for, as (network, netmask).
+# Unparseable IPv4 strings pack to 0 and so fall in the first range.
+RESERVED_IPV4_RANGES = (
+    (0x00000000, 0xFF000000),  # 0.0.0.0/8 "this network"
+    (0x0A000000, 0xFF000000),  # 10.0.0.0/8 private
+    (0x64400000, 0xFFC00000),  # 100.64.0.0/10 carrier-grade NAT
+    (0x7F000000, 0xFF000000),  # 127.0.0.0/8 loopback
+    (0xA9FE0000, 0xFFFF0000),  # 169.254.0.0/16 link-local
+    (0xAC100000, 0xFFF00000),  # 172.16.0.0/12 private
+    (0xC0000000, 0xFFFFFF00),  # 192.0.0.0/24 IETF protocol assignments
+    (0xC0000200, 0xFFFFFF00),  # 192.0.2.0/24 TEST-NET-1
+    (0xC0A80000, 0xFFFF0000),  # 192.168.0.0/16 private
+    (0xC6120000, 0xFFFE0000),  # 198.18.0.0/15 benchmarking
+    (0xC6336400, 0xFFFFFF00),  # 198.51.100.0/24 TEST-NET-2
+    (0xCB007100, 0xFFFFFF00),  # 203.0.113.0/24 TEST-NET-3
+    (0xE0000000, 0xF0000000),  # 224.0.0.0/4 multicast
+    (0xF0000000, 0xF0000000),  # 240.0.0.0/4 reserved + broadcast
+)
+NS_PER_DAY = 86_400 * 10**9
+ASYNC_MAX_CONNECTIONS = 64  # per-host connection cap; the rate limiter is the real bound
+
+# Retry policy for throttled/failed batches, shared by the sync adapter and the async loop
+RETRY_TOTAL = 5
+RETRY_BACKOFF = 1  # seconds; attempt n waits RETRY_BACKOFF * 2**n
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Shared keep-alive session for the synchronous path, retrying throttled/failed batches with backoff.
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=1,
+    max_retries=Retry(
+        total=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=list(RETRY_STATUSES),
+        allowed_methods=frozenset({"POST"}),  # ip-api batch is a POST, not retried by default
+    ),
+))
+
+# Output column -> ip-api response field
+GEO_FIELDS = {
+    "geo_status": "status",
+    "country": "country",
+    "country_code": "countryCode",
+    "region": "regionName",
+    "city": "city",
+    "lat": "lat",
+    "lon": "lon",
+    "isp": "isp",
+    "org": "org",
+    "asn": "as",
+    "timezone": "timezone",
+}
+# Low-cardinality geo string columns, stored as categoricals (one code per row + a small dictionary)
+GEO_CATEGORY_COLS = ("country", "country_code", "region", "isp", "org", "asn", "timezone")
 
 
 #This method help to normalize dataframe column names into strips whitespace, lowercases, replace spaces and dashes with underscores.
+#Only the column Index is replaced, the frame data is not copied.
 def normalize_cols(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df.columns = (
-        df.columns.str.strip()
-        .str.lower()
-        .str.replace(" ", "_")
-        .str.replace("-", "_")
-    )
+    df.columns = [normalize_col_name(c) for c in df.columns]
     return df
 
+
+#This method normalize a single column name the same way normalize_cols does.
+def normalize_col_name(name) -> str:
+    return str(name).strip().lower().translate(_COL_SEPARATORS)
+
+#This method pick the DATETIME_FORMATS entry matching the first non-null value of a column, None if none match.
+def detect_datetime_format(values: pd.Series) -> Optional[str]:
+    sample = values.dropna()
+    if sample.empty or not isinstance(sample.iloc[0], str):
+        return None
+    for fmt in DATETIME_FORMATS:
+        try:
+            datetime.strptime(sample.iloc[0], fmt)
+            return fmt
+        except ValueError:
+            continue
+    return None
+
+
 #This method covert data-like columnConvert date-like columns (first_seen_utc, last_online) into timezone-aware UTC datetime objects.
 def to_datetime(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
     for col in ("first_seen_utc", "last_online"):
         if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors="coerce", utc=True)
+            # An explicit format keeps pandas on its fast fixed-format parser; unknown layouts fall back to inference.
+            df[col] = pd.to_datetime(df[col], format=detect_datetime_format(df[col]),
+                                     errors="coerce", utc=True, cache=True)
     return df
 
 #This method map a port number to its well-known service name, if not found then use uncommon
+#Results are memoized per (port, proto) so /etc/services is only consulted once per port.
+@functools.lru_cache(maxsize=None)
 def port_to_service_name(port: int, proto: str = "tcp") -> str:
     try:
         return socket.getservbyport(int(port), proto)
@@ -67,49 +186,171 @@ def port_to_service_name(port: int, proto: str = "tcp") -> str:
 
 #This method will add a dst_port_name column by resolving port numbers to service names using socket.getservbyport()
 def enrich_ports(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
     if "dst_port" in df.columns:
         df["dst_port"] = pd.to_numeric(df["dst_port"], errors="coerce").astype("Int64")
-        df["dst_port_name"] = df["dst_port"].apply(
-            lambda p: port_to_service_name(p) if pd.notna(p) else None
-        )
+        # Resolve each distinct port once, then map the whole column.
+        port_map = {int(p): port_to_service_name(int(p))
+                    for p in df["dst_port"].dropna().unique()}
+        df["dst_port_name"] = df["dst_port"].map(port_map)
     return df
 
 
 #This method compute lifespan in days between 'first_seen_utc' and 'last_online' add lifespan_days column
 def compute_lifespan(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
     if {"first_seen_utc", "last_online"}.issubset(df.columns):
-        df["lifespan_days"] = (df["last_online"] - df["first_seen_utc"]).dt.days
+        # Subtract the raw UTC nanosecond buffers and floor-divide to whole days, like .dt.days.
+        first = df["first_seen_utc"].to_numpy("datetime64[ns]")
+        last = df["last_online"].to_numpy("datetime64[ns]")
+        missing = np.isnat(first) | np.isnat(last)
+        days = (last.view("i8") - first.view("i8")) // NS_PER_DAY
+        df["lifespan_days"] = pd.arrays.IntegerArray(np.where(missing, 0, days), missing)
     return df
 
 
-#This function load cached IP enrichment result from JSON, return {} if cache file dont exist.
+#This method return the append-only JSONL log that sits next to the cache JSON snapshot.
+def cache_log_path(cache_path: Path) -> Path:
+    return cache_path.with_suffix(".jsonl")
+
+
+#This function load cached IP enrichment result from the JSON snapshot plus its JSONL log, return {} if neither exist.
 def load_cache(cache_path: Path) -> Dict[str, dict]:
-    if cache_path and cache_path.exists():
+    cache: Dict[str, dict] = {}
+    if not cache_path:
+        return cache
+    if cache_path.exists():
         try:
-            return json.loads(cache_path.read_text(encoding="utf-8"))
+            cache = json.loads(cache_path.read_text(encoding="utf-8"))
         except Exception:
-            return {}
-    return {}
+            cache = {}
+    log_path = cache_log_path(cache_path)
+    if log_path.exists():
+        with open(log_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # torn line from an interrupted run
+                if rec.get("query"):
+                    cache[rec["query"]] = rec
+    return cache
+
 
+#This method return an inter-process lock guarding the cache snapshot and log, a no-op if filelock is missing.
+def cache_lock(cache_path: Path):
+    if FileLock is None:
+        return nullcontext()
+    return FileLock(str(cache_path) + ".lock")
 
-#This method will save encriched result to cache JSOn
+
+#This method append only the new batch results to the cache log, one JSON record per line.
+#The log is reopened per batch so appends never land in a log another run has just compacted away.
+def append_cache(cache_path: Path, results: List[dict]) -> None:
+    results = [r for r in results if not r.get("transient")]
+    if not results:
+        return
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    with cache_lock(cache_path):
+        with open(cache_log_path(cache_path), "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in results)
+
+
+#This method will compact the whole cache into the JSON snapshot and clear the log it now covers.
+#Entries other runs wrote since we loaded are merged in, and the snapshot is swapped in atomically.
 def save_cache(cache_path: Path, cache: Dict[str, dict]) -> None:
     if cache_path:
         cache_path.parent.mkdir(parents=True, exist_ok=True)
-        cache_path.write_text(
-            json.dumps(cache, ensure_ascii=False, indent=2),
-            encoding="utf-8"
-        )
+        with cache_lock(cache_path):
+            merged = load_cache(cache_path)
+            merged.update((ip, r) for ip, r in cache.items() if not r.get("transient"))
+            tmp = cache_path.with_suffix(".tmp")
+            tmp.write_text(
+                json.dumps(merged, ensure_ascii=False, separators=(",", ":")),
+                encoding="utf-8"
+            )
+            os.replace(tmp, cache_path)
+            cache_log_path(cache_path).unlink(missing_ok=True)
+
+#This method pack a dotted-quad IPv4 string into a 32-bit int, 0 if it is not a valid address.
+def ipv4_to_int(ip: str) -> int:
+    if ip.count(".") != 3:
+        return 0
+    try:
+        return int.from_bytes(socket.inet_aton(ip), "big")
+    except OSError:
+        return 0
+
+
+#This method flag IPs that are invalid or in a private/reserved IPv4 range, checked with one bitmask per range over all IPs.
+#IPv6 addresses are never flagged and are left for ip-api to resolve.
+def reserved_ip_mask(ips: List[str]) -> np.ndarray:
+    ints = np.fromiter((ipv4_to_int(ip) for ip in ips), dtype=np.uint32, count=len(ips))
+    is_v6 = np.fromiter((":" in ip for ip in ips), dtype=bool, count=len(ips))
+    mask = np.zeros(len(ips), dtype=bool)
+    for net, netmask in RESERVED_IPV4_RANGES:
+        mask |= (ints & np.uint32(netmask)) == np.uint32(net)
+    return mask & ~is_v6
 
 # This method Query ip-api.com batch endpoint for geolocation/ASN data. As for free it accepts a list of up to 100 IPs
-def ip_api_batch_query(ips: List[str], timeout: int = 10) -> List[dict]:
+def ip_api_batch_query(ips: List[str], timeout: int = 10,
+                       session: requests.Session = None) -> List[dict]:
     payload = [{"query": ip} for ip in ips]
-    resp = requests.post(IP_API_URL, json=payload, timeout=timeout)
+    resp = (session or _SESSION).post(IP_API_URL, json=payload, timeout=timeout)
     resp.raise_for_status()
     return resp.json()
 
+#This method build placeholder results for a batch that could not be queried, so the IPs still get a geo_status.
+#They are marked transient so they are never written to the cache and get re-queried on the next run.
+def failed_batch(ips: List[str], err: Exception) -> List[dict]:
+    return [{"query": ip, "status": "fail", "message": str(err), "transient": True} for ip in ips]
+
+
+#This method return how long to wait before retry number attempt, preferring the server's Retry-After / X-Ttl hint.
+def retry_delay(attempt: int, headers=None) -> float:
+    for name in ("Retry-After", "X-Ttl"):  # ip-api reports its rate-limit reset in X-Ttl
+        try:
+            return float(headers[name])
+        except (TypeError, KeyError, ValueError):
+            continue
+    return RETRY_BACKOFF * 2 ** attempt
+
+# This method is the async version of ip_api_batch_query, the shared limiter keeps all concurrent batches under the rpm budget.
+# Like the sync adapter, 429/5xx responses and connection errors are retried with backoff, each retry taking a new limiter slot.
+async def ip_api_batch_query_async(session, limiter, ips: List[str],
+                                   timeout: int = 10) -> List[dict]:
+    payload = [{"query": ip} for ip in ips]
+    for attempt in range(RETRY_TOTAL + 1):
+        try:
+            async with limiter:
+                async with session.post(IP_API_URL, json=payload,
+                                        timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                    if resp.status in RETRY_STATUSES and attempt < RETRY_TOTAL:
+                        delay = retry_delay(attempt, resp.headers)
+                    else:
+                        resp.raise_for_status()
+                        return await resp.json()
+        except aiohttp.ClientResponseError as e:
+            # Non-retryable status (or retries used up); raise_for_status errors are ClientErrors too
+            return failed_batch(ips, e)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == RETRY_TOTAL:
+                return failed_batch(ips, e)
+            delay = retry_delay(attempt)
+        except Exception as e:
+            return failed_batch(ips, e)
+        await asyncio.sleep(delay)
+
+#This method send all batches concurrently over one pooled session and hand each batch result to on_batch as soon as it arrives.
+async def query_batches_async(chunks: List[List[str]], rpm: int, timeout: int,
+                              on_batch) -> None:
+    # One token every 60/rpm seconds: AsyncLimiter(rpm, 60) would let the first rpm requests through at once.
+    limiter = AsyncLimiter(1, 60.0 / max(1, rpm))
+    connector = aiohttp.TCPConnector(limit_per_host=ASYNC_MAX_CONNECTIONS)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        tasks = [ip_api_batch_query_async(session, limiter, chunk, timeout)
+                 for chunk in chunks]
+        for fut in asyncio.as_completed(tasks):
+            on_batch(await fut)
+
 #This method will help in balance request per minute limit.
 def rate_limited_batches(items: List[str], batch_size: int, rpm: int):
     for i in range(0, len(items), batch_size):
@@ -119,52 +360,153 @@ def rate_limited_batches(items: List[str], batch_size: int, rpm: int):
             sleep_time = 60.0 / max(1, rpm)
             sleep(sleep_time)
 
-# This method will encrich the dataset uisng ip-api and add geolocation, ASN data, it will leverage the use of cached result if availbe, stores results in a cache JSON file.
-# Adds columns: country, region, city, ISP, ASN, lat, lon
-def enrich_geolocation(df: pd.DataFrame, cache_path: Path = None,
-                       rpm: int = 40, batch_size: int = 100,
-                       timeout: int = 10) -> pd.DataFrame:
-    df = df.copy()
-    if "dst_ip" not in df.columns:
-        return df
-
+#This method make sure every IP in ips has a cache entry, querying ip-api only for the misses, and return the cache.
+def resolve_ips(ips: List[str], cache_path: Path = None,
+                rpm: int = 40, batch_size: int = 100,
+                timeout: int = 10,
+                session: requests.Session = None) -> Dict[str, dict]:
     cache = load_cache(cache_path) if cache_path else {}
-    unique_ips = sorted({ip for ip in df["dst_ip"].dropna().astype(str) if ip})
-    to_query = [ip for ip in unique_ips if ip not in cache]
+    new_ips = [ip for ip in ips if ip and ip not in cache]
 
-    for chunk in rate_limited_batches(to_query, batch_size, rpm):
-        try:
-            results = ip_api_batch_query(chunk, timeout=timeout)
-        except Exception as e:
-            results = [{"query": ip, "status": "fail", "message": str(e)} for ip in chunk]
+    # Don't spend rate-limit budget on addresses ip-api can't geolocate.
+    reserved = reserved_ip_mask(new_ips)
+    to_query = [ip for ip, skip in zip(new_ips, reserved) if not skip]
+    skipped = [{"query": ip, "status": "fail", "message": "reserved range"}
+               for ip, skip in zip(new_ips, reserved) if skip]
 
+    def store(results: List[dict]) -> None:
         for res in results:
             q = res.get("query")
             if q:
                 cache[q] = res
+        if cache_path:
+            append_cache(cache_path, results)
+
+    if skipped:
+        store(skipped)
+
+    # An explicitly passed requests session pins the synchronous path (e.g. for tests).
+    if to_query and aiohttp is not None and session is None:
+        chunks = [to_query[i:i + batch_size] for i in range(0, len(to_query), batch_size)]
+        asyncio.run(query_batches_async(chunks, rpm, timeout, store))
+    else:
+        for chunk in rate_limited_batches(to_query, batch_size, rpm):
+            try:
+                results = ip_api_batch_query(chunk, timeout=timeout, session=session)
+            except Exception as e:
+                results = failed_batch(chunk, e)
+            store(results)
+
+    if new_ips:
         save_cache(cache_path, cache)
+    return cache
+
+
+#This method add the geo columns to df from an already populated cache, no network access.
+def apply_geolocation(df: pd.DataFrame, cache: Dict[str, dict]) -> pd.DataFrame:
+    # codes[i] indexes row i into unique_ips (-1 for missing), computed in C.
+    codes, unique_ips = pd.factorize(df["dst_ip"].astype("string"))
 
-    def map_ip(ip: str) -> dict:
-        r = cache.get(str(ip), {}) if cache else {}
-        return {
-            "geo_status": r.get("status"),
-            "country": r.get("country"),
-            "country_code": r.get("countryCode"),
-            "region": r.get("regionName"),
-            "city": r.get("city"),
-            "lat": r.get("lat"),
-            "lon": r.get("lon"),
-            "isp": r.get("isp"),
-            "org": r.get("org"),
-            "asn": r.get("as"),
-            "timezone": r.get("timezone"),
-        }
-
-    geo_df = df["dst_ip"].astype(str).apply(map_ip).apply(pd.Series)
-    df = pd.concat([df, geo_df], axis=1)
+    # Look up each unique IP in the cache once, then fan out to rows by fancy-indexing with codes.
+    cache_df = pd.DataFrame.from_dict(cache, orient="index")
+    cache_df = cache_df.reindex(index=pd.Index(unique_ips, dtype=object),
+                                columns=list(GEO_FIELDS.values()))
+    for col, field in GEO_FIELDS.items():
+        df[col] = take(cache_df[field].to_numpy(), codes, allow_fill=True)
     return df
 
 
+#This method dictionary-encode the repetitive geo string columns, done once on the final frame so shards share categories.
+def categorize_geo(df: pd.DataFrame) -> pd.DataFrame:
+    for col in GEO_CATEGORY_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+# This method will encrich the dataset uisng ip-api and add geolocation, ASN data, it will leverage the use of cached result if availbe, stores results in a cache JSON file.
+# Adds columns: country, region, city, ISP, ASN, lat, lon
+def enrich_geolocation(df: pd.DataFrame, cache_path: Path = None,
+                       rpm: int = 40, batch_size: int = 100,
+                       timeout: int = 10,
+                       session: requests.Session = None) -> pd.DataFrame:
+    if "dst_ip" not in df.columns:
+        return df
+
+    cache = resolve_ips(list(df["dst_ip"].dropna().astype("string").unique()),
+                        cache_path=cache_path, rpm=rpm, batch_size=batch_size,
+                        timeout=timeout, session=session)
+    apply_geolocation(df, cache)
+    return categorize_geo(df)
+
+
+# Read-only IP cache handed to each pool worker once by _init_shard_worker.
+_SHARD_CACHE: Dict[str, dict] = {}
+
+
+def _init_shard_worker(cache: Dict[str, dict]) -> None:
+    global _SHARD_CACHE
+    _SHARD_CACHE = cache
+
+
+#This method run the per-row enrichment steps on one shard inside a pool worker, using the warm cache only.
+def _enrich_shard(shard: pd.DataFrame) -> pd.DataFrame:
+    to_datetime(shard)
+    enrich_ports(shard)
+    compute_lifespan(shard)
+    if "dst_ip" in shard.columns:
+        apply_geolocation(shard, _SHARD_CACHE)
+    return shard
+
+
+#This method run the full enrichment pipeline on one frame, every step adds columns to df in place instead of copying it.
+#With workers > 1 the IP cache is warmed first, then the row-wise steps run on contiguous shards in a process pool
+#and a new concatenated frame is returned.
+def enrich(df: pd.DataFrame, cache_path: Path = None,
+           rpm: int = 40, batch_size: int = 100,
+           timeout: int = 10, workers: int = 1) -> pd.DataFrame:
+    normalize_cols(df)
+    if workers <= 1 or len(df) < workers:
+        to_datetime(df)
+        enrich_ports(df)
+        compute_lifespan(df)
+        enrich_geolocation(df, cache_path=cache_path,
+                           rpm=rpm, batch_size=batch_size,
+                           timeout=timeout)
+        return df
+
+    cache = {}
+    if "dst_ip" in df.columns:
+        cache = resolve_ips(list(df["dst_ip"].dropna().astype("string").unique()),
+                            cache_path=cache_path, rpm=rpm,
+                            batch_size=batch_size, timeout=timeout)
+    bounds = np.linspace(0, len(df), workers + 1, dtype=int)
+    shards = [df.iloc[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+    with mp.Pool(workers, initializer=_init_shard_worker, initargs=(cache,)) as pool:
+        parts = pool.map(_enrich_shard, shards)
+    return categorize_geo(pd.concat(parts))
+
+
+#This method read the input CSV with the pyarrow engine when it is installed, else the C engine.
+#All columns are kept because the enriched output carries them through.
+#The header is peeked first so INPUT_DTYPES also applies to raw names like "Dst IP" or "Dst-Port".
+def read_input(path: Path) -> pd.DataFrame:
+    engine = "pyarrow" if pyarrow is not None else "c"
+    header = pd.read_csv(path, nrows=0).columns
+    dtype = {c: INPUT_DTYPES[normalize_col_name(c)] for c in header
+             if normalize_col_name(c) in INPUT_DTYPES}
+    return pd.read_csv(path, engine=engine, dtype=dtype)
+
+
+#This method write the enriched frame as CSV or Snappy-compressed Parquet.
+def write_output(df: pd.DataFrame, out: Path, fmt: str) -> None:
+    out.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "parquet":
+        df.to_parquet(out, engine="pyarrow", compression="snappy", index=False)
+    else:
+        df.to_csv(out, index=False, encoding="utf-8")
+
+
 def main():
     ap = argparse.ArgumentParser(
         description="Enrich IOC CSV with IP geolocation/ASN and port names.",
@@ -177,33 +519,35 @@ def main():
     ap.add_argument("-i", "--input", required=True,
                     help="Path to input CSV (e.g., latest_feodo_aggressive.csv)")
     ap.add_argument("-o", "--output", required=True,
-                    help="Path to write enriched CSV")
+                    help="Path to write enriched CSV (or .parquet)")
     ap.add_argument("--cache", default="data/ip_geo_cache.json",
-                    help="Path to IP enrichment cache JSON")
+                    help="Path to IP enrichment cache JSON (new results go to a .jsonl log beside it)")
     ap.add_argument("--rps", type=int, default=40,
                     help="Requests per minute for ip-api batch (default=40)")
     ap.add_argument("--batch", type=int, default=100,
                     help="Batch size for ip-api (<=100, default=100)")
     ap.add_argument("--timeout", type=int, default=10,
                     help="HTTP timeout in seconds (default=10)")
+    ap.add_argument("--format", choices=("csv", "parquet"), default=None,
+                    help="Output format (default: parquet if --output ends in .parquet, else csv)")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Processes for the row-wise enrichment after IPs are resolved (default=1)")
     args = ap.parse_args()
 
     inp = Path(args.input)
     out = Path(args.output)
     cache_path = Path(args.cache) if args.cache else None
+    fmt = args.format or ("parquet" if out.suffix.lower() == ".parquet" else "csv")
+    if fmt == "parquet" and pyarrow is None:
+        ap.error("parquet output requires pyarrow (pip install pyarrow)")
 
-    df = pd.read_csv(inp)
-    df = normalize_cols(df)
-    df = to_datetime(df)
-    df = enrich_ports(df)
-    df = compute_lifespan(df)
-    df = enrich_geolocation(df, cache_path=cache_path,
-                            rpm=args.rps, batch_size=args.batch,
-                            timeout=args.timeout)
+    df = read_input(inp)
+    df = enrich(df, cache_path=cache_path,
+                rpm=args.rps, batch_size=args.batch,
+                timeout=args.timeout, workers=args.workers)
 
-    out.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(out, index=False, encoding="utf-8")
-    print(f"[+] Enriched CSV saved to: {out} (rows={len(df)})")
+    write_output(df, out, fmt)
+    print(f"[+] Enriched {fmt.upper()} saved to: {out} (rows={len(df)})")
 
 
 if __name__ == "__main__":
@@ -10,28 +10,79 @@
 # Notes:
 # - Saves to ./data/ by default with a timestamped filename and a stable symlink 'latest_feodo_aggressive.csv'.
 # - Requires internet access to fetch from: https://feodotracker.abuse.ch/downloads/ipblocklist_aggressive.csv
+# - ETag/Last-Modified of each download are kept in a sidecar <output>.meta.json; if the server answers
+#   304 Not Modified on the next run, the existing file is reused as-is.
 # 
 # """
 
 import argparse
 import datetime as dt
+import json
+import os
 from pathlib import Path
+import shutil
 import sys
+from typing import Tuple
+import urllib.error
 import urllib.request
 
 URL = "https://feodotracker.abuse.ch/downloads/ipblocklist_aggressive.csv" #getting all block c2 server list 
+CHUNK_SIZE = 64 * 1024  # bytes buffered per read while streaming the download to disk
+
+#This method return the sidecar file holding the ETag/Last-Modified validators for out_path.
+def meta_path(out_path: Path) -> Path:
+    return out_path.with_suffix(".meta.json")
+
+
+#This method build conditional request headers from the previous download, only if that file is still on disk.
+def conditional_headers(out_path: Path) -> dict:
+    meta = meta_path(out_path)
+    if not (out_path.exists() and meta.exists()):
+        return {}
+    try:
+        prev = json.loads(meta.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    headers = {}
+    if prev.get("etag"):
+        headers["If-None-Match"] = prev["etag"]
+    if prev.get("last_modified"):
+        headers["If-Modified-Since"] = prev["last_modified"]
+    return headers
+
 
 #This is the function to download the lastest dataset from feodotracker site which will use later to visualize the c2 block ip server.
-def download_file(url: str, out_path: Path) -> Path:
+#Returns (path, changed); changed is False when the server answered 304 and the existing file was kept.
+#The body is streamed to a temp file and only swapped in once complete, so a failed download never replaces a good file.
+def download_file(url: str, out_path: Path) -> Tuple[Path, bool]:
     out_path.parent.mkdir(parents=True, exist_ok=True)
+    req = urllib.request.Request(url, headers=conditional_headers(out_path))
+    tmp_path = out_path.with_name(out_path.name + ".part")
+    meta = meta_path(out_path)
     try:
-        with urllib.request.urlopen(url) as resp:
-            data = resp.read()
-        out_path.write_bytes(data)
-        return out_path
+        with urllib.request.urlopen(req) as resp, open(tmp_path, "wb") as f:
+            shutil.copyfileobj(resp, f, CHUNK_SIZE)
+            # Chunked reads return short data instead of raising when the connection drops
+            expected = resp.headers.get("Content-Length")
+            if expected is not None and f.tell() != int(expected):
+                raise OSError(f"incomplete download: got {f.tell()} of {expected} bytes")
+            validators = {
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+            }
+        # Drop the old validators first so they can never describe the replaced file
+        meta.unlink(missing_ok=True)
+        os.replace(tmp_path, out_path)
+        meta.write_text(json.dumps(validators), encoding="utf-8")
+        return out_path, True
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return out_path, False
+        print(f"[!] Download failed: {e}", file=sys.stderr)
     except Exception as e:
         print(f"[!] Download failed: {e}", file=sys.stderr)
-        sys.exit(1)
+    tmp_path.unlink(missing_ok=True)
+    sys.exit(1)
 
 #This method remove the first 8 line which is just detail of csv and last line of the file.
 def jargonRemover(file_path: Path) -> Path:
@@ -65,11 +116,14 @@ def main():
         today = dt.datetime.now(dt.UTC).strftime("%Y%m%d")
         out_path = Path("data") / f"feodo_aggressive_{today}.csv"
 
-    saved = download_file(URL, out_path)
+    saved, changed = download_file(URL, out_path)
     print(f"\nDownloading latest dataset............./")
-    print(f"[+] Saved: {saved} ({saved.stat().st_size} bytes)\n")
-
-    jargonRemover(saved);
+    if changed:
+        print(f"[+] Saved: {saved} ({saved.stat().st_size} bytes)\n")
+        jargonRemover(saved);
+    else:
+        # Already cleaned on the run that downloaded it
+        print(f"[=] Not modified since last download, reusing: {saved}\n")
     # Maintain a stable "latest" file for downstream pipelines
     latest = saved.parent / "latest_feodo_aggressive.csv"
     try: